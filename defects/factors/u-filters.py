@@ -0,0 +1,76 @@
+"""
+# Check &..factors.filters queue and keyword selection.
+"""
+from ...factors import filters as module
+
+def test_SQueue_take(test):
+	"""
+	# Check that items are produced in order and that the status reflects the takes.
+	"""
+	q = module.SQueue(range(5))
+	test/q.status() == (0, 5)
+	test/q.terminal() == False
+
+	test/q.take(2) == [0, 1]
+	test/q.status() == (2, 5)
+	test/q.take(2) == [2, 3]
+	test/q.take(2) == [4]
+	test/q.status() == (5, 5)
+	test/q.terminal() == True
+	test/q.take(2) == []
+
+def test_SQueue_empty(test):
+	q = module.SQueue(())
+	test/q.terminal() == True
+	test/q.status() == (0, 0)
+	test/q.take(1) == []
+
+def test_check_keywords(test):
+	"""
+	# Check the keyword prefixes and their precedence.
+	"""
+	ck = module.check_keywords
+	test/ck(['@u-graph'], 'u-graph') == True
+	test/ck(['@u-graph'], 'u-graph-x') == False
+	test/ck(['.graph'], 'u-graph') == True
+	test/ck(['+graph'], 'u-graph') == True
+	test/ck(['-graph', '+graph'], 'u-graph') == False
+	test/ck(['+graph', '-graph'], 'u-graph') == True
+	test/ck(['gra'], 'u-graph') == True
+	test/ck(['cc'], 'u-graph') == False
+
+	# Whitespace keywords only; unconstrained.
+	test/ck([' '], 'u-graph') == True
+	test/ck([' ', 'cc'], 'u-graph') == False
+
+def test_select_keywords(test):
+	"""
+	# Check that compiled keywords can be reused across names.
+	"""
+	kw = module.compile_keywords(['-cc', 'u-'])
+	test/module.select_keywords(kw, 'u-graph') == True
+	test/module.select_keywords(kw, 'i-cc') == False
+	test/module.select_keywords(kw, 'i-trace') == False
+
+def test_select_keywords_non_ascii(test):
+	"""
+	# Check that whitelists and blacklists apply to names with non-ASCII characters.
+	"""
+	kw = module.compile_keywords(['+é'])
+	test/module.select_keywords(kw, 'u-é') == True
+	test/module.select_keywords(kw, 'u-e') == False
+
+	kw = module.compile_keywords(['-x', 'u-'])
+	test/module.select_keywords(kw, 'u-é.x') == False
+	test/module.select_keywords(kw, 'u-é') == True
+
+def test_SQueue_sequences(test):
+	"""
+	# Check that tuples and iterators are queued like lists.
+	"""
+	for items in [(1, 2, 3), iter([1, 2, 3]), [1, 2, 3]]:
+		q = module.SQueue(items)
+		test/q.status() == (0, 3)
+		test/q.take(2) == [1, 2]
+		test/q.take(2) == [3]
+		test/q.terminal() == True
@@ -0,0 +1,53 @@
+"""
+# Check the counters written by modules compiled with &..python.instrumentation.
+"""
+import os
+import sys
+import marshal
+import subprocess
+from fault.system import files
+from ...python import instrumentation as module
+
+sample = (
+	"def f(x):\n"
+	"	if x:\n"
+	"		return 1\n"
+	"	return 2\n"
+	"for i in range(3):\n"
+	"	f(i)\n"
+)
+
+# Execute the marshalled code object read from standard input as the module, `sample`.
+loader = (
+	"import sys, marshal\n"
+	"exec(marshal.loads(sys.stdin.buffer.read()), {'__name__': 'sample', '__file__': sys.argv[1]})\n"
+)
+
+def test_coverage_capture(test):
+	"""
+	# Check that the areas executed by an instrumented module and their counts
+	# are written to METRICS_CAPTURE on exit.
+	"""
+	tr = test.exits.enter_context(files.Path.fs_tmpdir())
+	src = tr/'sample.py'
+	src.fs_store(sample.encode('utf-8'))
+
+	tree = module.compile('sample', sample, str(src), [], record=set())
+	co = compile(tree, str(src), 'exec')
+
+	env = dict(os.environ)
+	env['METRICS_CAPTURE'] = str(tr/'metrics')
+	env['METRICS_IDENTITY'] = 'test'
+	env['PROCESS_IDENTITY'] = '1'
+	p = subprocess.run(
+		[sys.executable, '-c', loader, str(src)],
+		input=marshal.dumps(co), env=env,
+	)
+	test/p.returncode == 0
+
+	counters = tr/'metrics'/'coverage'/'1'/'sample'/'test'/'.fault-syntax-counters'
+	read = (lambda x: (counters/x).fs_load().decode('utf-8'))
+
+	test/read('sources') == "3 " + str(src) + "\n"
+	test/read('areas') == "5 9 5 17\n6 1 6 5\n2 4 2 5\n"
+	test/read('counts') == "1\n3\n3\n"
@@ -0,0 +1 @@
+__factor_type__ = 'tests'
@@ -0,0 +1,66 @@
+"""
+# Check the persistence of &..tools.llvm.query outputs.
+"""
+import os
+from fault.system import files
+from ...tools.llvm import query as module
+
+def script(route, text):
+	route.fs_store(('#!/bin/sh\n' + text).encode('utf-8'))
+	os.chmod(str(route), 0o755)
+	return route
+
+def cache(test, tr):
+	"""
+	# Direct the query cache into &tr for the duration of the test.
+	"""
+	previous = os.environ.get('XDG_CACHE_HOME')
+	def restore():
+		if previous is None:
+			os.environ.pop('XDG_CACHE_HOME', None)
+		else:
+			os.environ['XDG_CACHE_HOME'] = previous
+	test.exits.callback(restore)
+
+	os.environ['XDG_CACHE_HOME'] = str(tr/'cache')
+	return tr/'cache'/'fault'/'llvm-query'
+
+def test_failed_query_not_persisted(test):
+	"""
+	# Check that the outputs of a failed llvm-config are not stored.
+	"""
+	tr = test.exits.enter_context(files.Path.fs_tmpdir())
+	cached = cache(test, tr)
+	exe = script(tr/'llvm-config', 'exit 127\n')
+
+	test/module.QueryError ^ (lambda: module.llvm_config_outputs(str(exe)))
+	test/cached.fs_type() == 'void'
+
+	# Still failing; not satisfied by a stored entry.
+	test/module.QueryError ^ (lambda: module.llvm_config_outputs(str(exe)))
+
+def test_successful_query_persisted(test):
+	"""
+	# Check that successful outputs are stored and reused.
+	"""
+	tr = test.exits.enter_context(files.Path.fs_tmpdir())
+	cached = cache(test, tr)
+	exe = script(tr/'llvm-config', 'echo "$@"\n')
+
+	outputs = module.llvm_config_outputs(str(exe))
+	test/len(outputs) == 2
+	test/outputs[1].strip() == '--libs coverage'
+	test/len(cached.fs_list()[1]) == 1
+
+	# Reused while the executable is unchanged.
+	test/module.llvm_config_outputs(str(exe)) == outputs
+
+def test_instrumentation_short_config(test):
+	"""
+	# Check that llvm-config output lacking expected lines is rejected.
+	"""
+	tr = test.exits.enter_context(files.Path.fs_tmpdir())
+	cache(test, tr)
+	exe = script(tr/'llvm-config', 'echo "$@"\n')
+
+	test/module.QueryError ^ (lambda: module.instrumentation(exe))
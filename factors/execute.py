@@ -45,10 +45,12 @@ def product_variants(product):
 		yield lsf.types.Variants(sys, arch)
 
 def system_execute(systemcontext, product, factor, path, image, argv):
-	os.environ['SYSTEMCONTEXT'] = str(systemcontext)
-	os.environ['PRODUCT'] = str(product)
-	os.environ['FACTOR'] = str(factor)
-	os.environ['FACTORIMAGE'] = str(image)
+	os.environ.update({
+		'SYSTEMCONTEXT': str(systemcontext),
+		'PRODUCT': str(product),
+		'FACTOR': str(factor),
+		'FACTORIMAGE': str(image),
+	})
 	os.execv(path, argv)
 
 def export_execute(systemcontext, product, factor, argv):
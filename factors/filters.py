@@ -9,57 +9,124 @@ class SQueue(object):
 	# Queue implementation providing completion signalling interfaces consistent
 	# with &graph.Queue.
 	"""
+	__slots__ = ('items', 'count', 'head')
 
 	def __init__(self, sequence):
-		self.items = list(sequence)
+		# &items is never modified, so given sequences are referenced rather than copied.
+		if isinstance(sequence, (list, tuple)):
+			self.items = sequence
+		else:
+			self.items = list(sequence)
 		self.count = len(self.items)
+		# Position of the next item; taken items are not removed from &items.
+		self.head = 0
 
 	def take(self, i):
-		r = self.items[:i]
-		del self.items[:i]
+		h = self.head
+		r = self.items[h:h+i]
+		if isinstance(r, tuple):
+			r = list(r)
+		self.head = h + len(r)
 		return r
 
 	def finish(self, *items):
 		pass
 
 	def terminal(self):
-		return not self.items
+		return self.head >= self.count
 
 	def status(self):
-		return (self.count - len(self.items), self.count)
+		return (self.head, self.count)
 
-def check_keywords(keywords, name, Table=str.maketrans('_.-', '   ')):
-	name_str = str(name)
-	name_set = set(str(name).translate(Table).split())
+def compile_keywords(keywords):
+	"""
+	# Prepare &keywords for &select_keywords.
+
+	# The prefix of each keyword is identified once so that selection of
+	# many names does not repeat the classification.
+
+	# [ Returns ]
+	# The sequence of `(ccode, operand, ascii_operand)` checks and whether the keywords
+	# were all whitespace. `ascii_operand` is the encoded form of whitelist and blacklist
+	# operands, or &None when the operand is not ASCII.
+	"""
+	checks = []
 	empty_constraints = 0
 
 	for k in keywords:
 		ccode = k[:1]
 
-		if ccode == '@':
-			if name_str == k[1:]:
-				return True
-		elif ccode == '.':
-			if name_str.endswith(k[1:]):
-				return True
-		elif ccode == '+':
-			# Whitelist
-			if k[1:] in name_set:
-				return True
-		elif ccode == '-':
-			# Blacklist
-			if k[1:] in name_set:
-				return False
-		elif k in name_str:
-			return True
+		if ccode in {'+', '-'}:
+			operand = k[1:]
+			try:
+				checks.append((ccode, operand, operand.encode('ascii')))
+			except UnicodeEncodeError:
+				checks.append((ccode, operand, None))
+		elif ccode in {'@', '.'}:
+			checks.append((ccode, k[1:], None))
 		else:
+			checks.append(('', k, None))
 			if k.strip() == '':
 				empty_constraints += 1
 
 	# False, normally. True when all the keywords were whitespace.
-	return len(keywords) == empty_constraints
+	return tuple(checks), len(keywords) == empty_constraints
+
+def select_keywords(compiled, name,
+		Table=str.maketrans('_.-', '   '),
+		ASCIITable=bytes.maketrans(b'_.-', b'   '),
+	):
+	"""
+	# Check &name against the keywords prepared by &compile_keywords.
 
-def projectvector(factors, projectname):
+	# The tokens of ASCII names are isolated as &bytes as the translation
+	# is considerably faster than the &str form.
+	"""
+	checks, default = compiled
+	name_str = str(name)
+	name_set = None
+
+	for ccode, k, kb in checks:
+		if ccode == '':
+			if k in name_str:
+				return True
+		elif ccode == '@':
+			if name_str == k:
+				return True
+		elif ccode == '.':
+			if name_str.endswith(k):
+				return True
+		else:
+			if name_set is None:
+				try:
+					name_set = set(name_str.encode('ascii').translate(ASCIITable).split())
+					ascii = True
+				except UnicodeEncodeError:
+					name_set = set(name_str.translate(Table).split())
+					ascii = False
+
+			if (kb if ascii else k) in name_set:
+				# Whitelist or Blacklist
+				return ccode == '+'
+
+	return default
+
+def check_keywords(keywords, name):
+	return select_keywords(compile_keywords(keywords), name)
+
+def projecttable(factors):
+	"""
+	# Identify the projects of &factors with the string form of their factor path.
+	"""
+	return [(pj.identifier, str(pj.factor)) for pj in factors.iterprojects()]
+
+def projectvector(factors, projectname, table=None):
+	"""
+	# Identify the projects selected by &projectname.
+
+	# When given, &table is used for prefix matches; it is filled by
+	# &projecttable on first use so that it may be shared by multiple calls.
+	"""
 	try:
 		# Exact project factor.
 		return [
@@ -68,16 +135,22 @@ def projectvector(factors, projectname):
 		]
 	except LookupError:
 		# Presume factor prefix match.
+		if table is None:
+			table = projecttable(factors)
+		elif not table:
+			table.extend(projecttable(factors))
+
 		return [
-			pj.identifier for pj in factors.iterprojects()
-			if str(pj.factor).startswith(projectname)
+			identifier for identifier, factor in table
+			if factor.startswith(projectname)
 		]
 
 def projectgraph(factors, projects):
 	if projects:
 		pvector = []
+		table = []
 		for projectname in projects:
-			pvector.extend(projectvector(factors, projectname))
+			pvector.extend(projectvector(factors, projectname, table))
 		q = SQueue(pvector)
 	else:
 		q = graph.Queue()
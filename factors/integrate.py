@@ -55,27 +55,25 @@ required = {
 }
 
 def plan(command,
-		cc:files.Path,
-		ccmode:str,
 		factors:lsf.Context,
-		features:Sequence[str],
-		cachetype:str,
-		cachepath:files.Path,
+		xargv:Sequence[str],
 		ctl:map.Controls,
 		identifier,
 	):
 	"""
-	# Create an invocation for processing &pj with &cc.
+	# Create an invocation for processing the project selected by &identifier
+	# using the `factors-cc` command vector, &xargv.
+
+	# &xargv is the `factors-cc` dispatch vector extended with the construction context,
+	# mode, cache, and feature arguments. They are invariant across projects and
+	# prepared once by &dispatch.
 	"""
 
 	pj = factors.project(identifier)
 	project = pj.factor
-	env, exepath, xargv = query.dispatch('factors-cc')
 
 	pj_fp = str(project)
 	ki = KInvocation(xargv[0], xargv + [
-		str(cc), ccmode, cachetype, str(cachepath),
-		':'.join(features),
 		str(pj.product.route),
 		pj_fp,
 	])
@@ -90,15 +88,15 @@ def dispatch(exits, meta, log, config, cc, pdr:files.Path, argv):
 
 	from fault.transcript.metrics import Procedure
 	zero = Procedure.create()
-	os.environ['PRODUCT'] = str(pdr)
-	os.environ['F_PRODUCT'] = str(cc)
-	os.environ['FPI_REBUILD'] = str(config['relevel'])
+	os.environ.update({
+		'PRODUCT': str(pdr),
+		'F_PRODUCT': str(cc),
+		'FPI_REBUILD': str(config['relevel']),
+	})
 	lanes = int(config['processing-lanes'])
 
 	projects = argv
-	features = sorted(list(config['features']))
-	if not features:
-		features = ['optimal']
+	features = ':'.join(sorted(config['features'])) or 'optimal'
 
 	idx_update = config.get('update-product-index', 'missing')
 	if idx_update != 'never':
@@ -130,17 +128,18 @@ def dispatch(exits, meta, log, config, cc, pdr:files.Path, argv):
 	factors.load()
 	factors.configure()
 
+	# Invariant across projects; resolved and formatted once rather than per plan.
+	env, exepath, xargv = query.dispatch('factors-cc')
+	xargv = xargv + [
+		str(cc), config['construction-mode'], cachetype, str(cachepath),
+		features,
+	]
+
 	ctl = map.Controls(
 		log, meta,
 		query.ipath / 'integration',
 		'system.images.render',
-		ctl_plan = tools.partial(
-			plan, 'integrate',
-			cc,
-			config['construction-mode'],
-			factors, features,
-			cachetype, cachepath,
-		),
+		ctl_plan = tools.partial(plan, 'integrate', factors, xargv),
 		ctl_argv = [],
 		ctl_transcript_type = 'processing-units',
 		ctl_lanes = int(config['processing-lanes']),
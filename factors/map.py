@@ -104,14 +104,18 @@ def plan_select(factors:lsf.Context, ctl:Controls, selection):
 				return Inner(project, fp, ft)
 		filtered = typefilter
 
+	# Command prefix and the identifier prefix common to the selected factors.
+	pj_cmd = xargv + ctl.ctl_argv + [pj_fp]
+	xid_prefix = pj_fp + '/'
+
 	for (fp, ft), fd in pj.select(rfp):
 		if filtered(project, fp, ft):
 			continue
 
 		fpstr = str(fp)
-		xid = '/'.join((pj_fp, fpstr))
+		xid = xid_prefix + fpstr
 
-		cmd = xargv + ctl.ctl_argv + [pj_fp, fpstr]
+		cmd = pj_cmd + [fpstr]
 		ki = KInvocation(cmd[0], cmd, environ=env)
 
 		yield (pj_fp, (fpstr,), xid, ki)
@@ -61,6 +61,8 @@ required = {
 def plan(prefixes, keywords, factors:lsf.Context, ctl:map.Controls, identifier):
 	"""
 	# Create an invocation for processing the project from &factors selected using &identifier.
+
+	# &keywords is the result of &filters.compile_keywords or &None when unconstrained.
 	"""
 
 	pj = factors.project(identifier)
@@ -72,8 +74,18 @@ def plan(prefixes, keywords, factors:lsf.Context, ctl:map.Controls, identifier):
 	exeenv, exepath, xargv = query.dispatch('python')
 	xargv.append('-d')
 
-	if keywords:
-		kwcheck = (lambda x: filters.check_keywords(keywords, x))
+	# Shared by the invocations of the project's tests; consistent with &map.plan_select.
+	env = dict(os.environ)
+	env.update(exeenv)
+	pj_fp = str(project)
+	env['F_PROJECT'] = pj_fp
+
+	# Command prefix and the identifier prefix common to the project's tests.
+	analyze = xargv + ['fault.test.analyze', test_pj_str]
+	xid_prefix = test_pj_str + '/'
+
+	if keywords is not None:
+		kwcheck = (lambda x: filters.select_keywords(keywords, x))
 	else:
 		kwcheck = (lambda x: True) # Always true if unconstrainted
 
@@ -83,17 +95,10 @@ def plan(prefixes, keywords, factors:lsf.Context, ctl:map.Controls, identifier):
 		if not kwcheck(fp):
 			continue
 
-		pj_fp = str(project)
 		test_fp = str(fp)
-		xid = '/'.join((test_pj_str, test_fp))
-
-		cmd = xargv + [
-			'fault.test.analyze',
-			str(test_project.factor), test_fp
-		]
-		env = dict(os.environ)
-		env.update(exeenv)
-		env['F_PROJECT'] = str(project)
+		xid = xid_prefix + test_fp
+
+		cmd = analyze + [test_fp]
 		ki = KInvocation(cmd[0], cmd, environ=env)
 
 		yield (pj_fp, (test_fp,), xid, ki)
@@ -103,14 +108,22 @@ def test(exits, meta, log, config, cc, pdr:files.Path, argv):
 	# Perform runtime analysis using the selected factors.
 	"""
 
-	os.environ['PRODUCT'] = str(pdr)
-	os.environ['F_PRODUCT'] = str(cc)
+	os.environ.update({
+		'PRODUCT': str(pdr),
+		'F_PRODUCT': str(cc),
+	})
 
 	test_prefixes = set([
 		test_type_map[x] for x in config['test-types'] or {'integration', 'unit'}
 	])
 	lanes = int(config['processing-lanes'])
 
+	# Classified once for all the planned projects.
+	if config['test-filters']:
+		keywords = filters.compile_keywords(config['test-filters'])
+	else:
+		keywords = None
+
 	# Configured Factor Context
 	factors = lsf.Context()
 	factors.connect(pdr)
@@ -121,7 +134,7 @@ def test(exits, meta, log, config, cc, pdr:files.Path, argv):
 		log, meta,
 		query.ipath / 'python',
 		'fault.test.analyze',
-		ctl_plan = tools.partial(plan, test_prefixes, config['test-filters'], factors),
+		ctl_plan = tools.partial(plan, test_prefixes, keywords, factors),
 		ctl_argv = [],
 		ctl_transcript_type = 'test-fates',
 		ctl_lanes = int(config['processing-lanes']),
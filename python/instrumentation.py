@@ -18,86 +18,113 @@ expression_mapping = {
 	ast.comprehension: 'value',
 }
 
-def visit_expression(node, parent, field, index, isinstance=isinstance):
-	"""
-	# Visit the node in a statement. Keyword defaults, expressions, statements.
-	"""
-
-	if isinstance(node, ast.withitem):
-		yield from visit_expression(node.context_expr, node, 'context_expr', None)
-		return
-	elif isinstance(node, (ast.keyword, ast.Starred, ast.comprehension)):
-		# Instrument the inside of the comprehension.
-		yield from visit_expression(node.value, node, 'value', None)
-		return
-	elif isinstance(node, ast.arguments):
-		# Only need keywords.
-		for i, v in source.sequence_nodes(node.kw_defaults):
-			yield from visit_expression(v, node, 'kw_defaults', i)
-		return
-	elif isinstance(node, (ast.Expr, ast.Return, ast.Assign, ast.AugAssign)):
-		yield node.value, node, 'value', None
-	else:
-		# Count the expression as a whole.
-		yield node, parent, field, index
-
-	branches = set(x for x in source.bottom(node) if isinstance(x[0], BranchNodes))
-	for x in branches:
-		if isinstance(x[0], ast.BoolOp):
-			for i, v in zip(range(len(x[0].values)), x[0].values):
-				if isinstance(v, ast.AST):
-					yield (v, x[0], 'values', i)
-		elif isinstance(x[0], ast.IfExp):
-			for y in source.shallow(x[0]):
-				yield y
-		else:
-			pass # Never
-
-def visit_container(nodes, parent, field, isinstance=isinstance):
-	for index, stmt in nodes:
-		if isinstance(stmt, ast.For):
-			yield from visit_expression(stmt.iter, stmt, 'iter', None)
-			yield from visit_container(source.sequence_nodes(stmt.body), stmt, 'body')
-		elif hasattr(stmt, 'body'):
-			yield from visit(stmt, parent, field, index)
-		elif isinstance(stmt, ast.arguments):
-			# Only need keywords.
-			for i, v in source.sequence_nodes(stmt.kw_defaults):
-				yield from visit_expression(v, stmt, 'kw_defaults', i)
-		elif isinstance(stmt, ast.Expr) and stmt.col_offset == -1:
-			# Likely docstring.
-			pass
-		elif isinstance(stmt, (ast.Name,)):
-			pass
-		elif isinstance(stmt, (ast.Break, ast.Continue)):
-			yield (stmt, parent, field, index)
-		else:
-			yield from visit_expression(stmt, parent, field, index)
+# Work item kinds used by &visit.
+_visit_fields = 0
+_visit_statement = 1
+_visit_expression = 2
+_visit_branch = 3
 
-def visit(node, parent=None, field=None, index=None, sequencing=source.sequence_nodes):
+def visit(node, parent=None, field=None, index=None, isinstance=isinstance, hasattr=hasattr, children=source.children):
 	"""
 	# Identify nodes that should be instrumented for coverage and profiling.
+
+	# The tree is descended with an explicit stack of `(kind, node, parent, field, index)`
+	# work items rather than recursive generators. Statement sequences are pushed in
+	# ascending order so that they are produced in reverse, allowing the consumer to
+	# perform instrumentation insertions immediately. &ast.BoolOp and &ast.IfExp branches
+	# are identified while descending the expressions already being visited.
 	"""
-	for subfield, subnode in ast.iter_fields(node):
-		if isinstance(subnode, ast.AST):
-			yield from visit_expression(subnode, node, subfield, None)
-		elif isinstance(subnode, list):
-			yield from visit_container(sequencing(subnode), node, subfield)
+	stack = [(_visit_fields, node, parent, field, index)]
+	push = stack.append
+	pop = stack.pop
+
+	while stack:
+		kind, node, parent, field, index = pop()
+
+		if kind == _visit_branch:
+			subnodes = list(children(node))
+
+			if isinstance(node, ast.BoolOp):
+				for i, v in enumerate(node.values):
+					if isinstance(v, ast.AST):
+						yield (v, node, 'values', i)
+			elif isinstance(node, ast.IfExp):
+				yield from source.shallow(node)
+
+			for x in subnodes:
+				push((_visit_branch, x, None, None, None))
+			continue
+		elif kind == _visit_fields:
+			# Expressions and statement sequences of a node with a body.
+			d = node.__dict__
+			for subfield in reversed(type(node)._fields):
+				subnode = d.get(subfield)
+				if isinstance(subnode, ast.AST):
+					push((_visit_expression, subnode, node, subfield, None))
+				elif isinstance(subnode, list):
+					for i, stmt in enumerate(subnode):
+						push((_visit_statement, stmt, node, subfield, i))
+			continue
+		elif kind == _visit_statement:
+			if isinstance(node, ast.For):
+				for i, stmt in enumerate(node.body):
+					push((_visit_statement, stmt, node, 'body', i))
+				push((_visit_expression, node.iter, node, 'iter', None))
+				continue
+			elif hasattr(node, 'body'):
+				push((_visit_fields, node, parent, field, index))
+				continue
+			elif isinstance(node, ast.Expr) and node.col_offset == -1:
+				# Likely docstring.
+				continue
+			elif isinstance(node, (ast.Name,)):
+				continue
+			elif isinstance(node, (ast.Break, ast.Continue)):
+				yield (node, parent, field, index)
+				continue
+			# Otherwise, processed as an expression.
+
+		# Visit the node in a statement. Keyword defaults, expressions, statements.
+		if isinstance(node, ast.withitem):
+			push((_visit_expression, node.context_expr, node, 'context_expr', None))
+			continue
+		elif isinstance(node, (ast.keyword, ast.Starred, ast.comprehension)):
+			# Instrument the inside of the comprehension.
+			push((_visit_expression, node.value, node, 'value', None))
+			continue
+		elif isinstance(node, ast.arguments):
+			# Only need keywords; absent defaults are designated with &None.
+			for i, v in enumerate(node.kw_defaults):
+				if v is not None:
+					push((_visit_expression, v, node, 'kw_defaults', i))
+			continue
+
+		# Identify the children before the consumer has the opportunity
+		# to substitute the produced node.
+		subnodes = list(children(node))
+
+		if isinstance(node, (ast.Expr, ast.Return, ast.Assign, ast.AugAssign)):
+			yield node.value, node, 'value', None
 		else:
-			pass
+			# Count the expression as a whole.
+			yield node, parent, field, index
+
+		for x in subnodes:
+			push((_visit_branch, x, None, None, None))
 
 coverage_module_context = """
 if True:
-	import collections as _fi_cl
+	import array as _fi_ar
 	import atexit as _fi_ae
-	import functools as _fi_ft
 	import os as _fi_os
 
-	_fi_counters__ = _fi_cl.Counter()
+	# Indexed by the counter identifiers assigned by &compile.
+	# _FI_AREAS__ is injected as a constant and holds the area of each identifier.
+	_fi_counters__ = _fi_ar.array('Q', [0]) * len(_FI_AREAS__)
 	_fi_identity = _fi_os.environ.get('METRICS_IDENTITY') or ''
 
-	def _fi_record(counters=_fi_counters__, origin=_fi_identity, Retry=32):
-		import sys, os, collections
+	def _fi_record(counters=_fi_counters__, areas=_FI_AREAS__, source=__file__, origin=_fi_identity, Retry=32):
+		import sys, os
 
 		if 'PROCESS_IDENTITY' in os.environ:
 			pid = os.environ['PROCESS_IDENTITY']
@@ -136,50 +163,40 @@ if True:
 			else:
 				break
 
-		# Vectorize the counters.
-		events = collections.defaultdict(list)
-		occurrences = collections.defaultdict(list)
-		for (fp, area), v in counters.items():
-			events[fp].append(area)
-			occurrences[fp].append(v)
-
-		# Sequence the sources for an index.
-		# The contents of the vectors will be emitted according to this list.
-		sources = list(events.keys())
-		sources.sort()
+		# Vectorize the counters; only the areas that were executed are recorded.
+		events = [(a, c) for a, c in zip(areas, counters) if c]
 
 		# Index designating sources and the number of counters.
-		# For Python, this will normally (always) be a single line.
+		# For Python, this is a single line when any counters were executed.
 		# Append as PROCESS_IDENTITY may be intentionally redundant.
-		with open(path + '/sources', 'a') as f:
-			f.writelines(['%d %s\\n' %(len(events[x]), x) for x in sources])
-
-		with open(path + '/areas', 'a') as f:
-			for x in sources:
-				f.writelines(['%d %d %d %d\\n' % k for k in events[x]])
-
-		with open(path + '/counts', 'a') as f:
-			for x in sources:
-				f.writelines(['%d\\n' %(c,) for c in occurrences[x]])
+		# Each file is formatted in full and issued as a single write
+		# on an unbuffered descriptor.
+		sources_data = ('%d %s\\n' %(len(events), source)) if events else ''
+		areas_data = ''.join(['%d %d %d %d\\n' % k for k, c in events])
+		counts_data = ''.join(['%d\\n' %(c,) for k, c in events])
+
+		flags = os.O_WRONLY|os.O_CREAT|os.O_APPEND
+		for name, data in (('/sources', sources_data), ('/areas', areas_data), ('/counts', counts_data)):
+			data = data.encode('utf-8')
+			fd = os.open(path + name, flags, 0o666)
+			try:
+				while data:
+					data = data[os.write(fd, data):]
+			finally:
+				os.close(fd)
 
 	_fi_ae.register(_fi_record)
 
-	try:
-		_FI_INCREMENT__ = _fi_ft.partial(_fi_cl._count_elements, _fi_counters__)
-	except:
-		_FI_INCREMENT__ = _fi_counters__.update
-
-	def _FI_COUNT__(area, rob, F=__file__, C=_FI_INCREMENT__):
-		C(((F, area),))
+	def _FI_COUNT__(identifier, rob, C=_fi_counters__):
+		# Not atomic; concurrent threads may lose increments of the same area.
+		# Coverage only depends on an area being nonzero, which is preserved.
+		C[identifier] += 1
 		return rob
 
 	# Limit names left in the module globals.
-	del _fi_os, _fi_ft, _fi_cl, _fi_ae, _fi_record, _fi_identity
+	del _fi_os, _fi_ar, _fi_ae, _fi_record, _fi_identity
 """.strip() + '\n'
 
-count_boolop_expression = "(_FI_INCREMENT__(((__file__, %r),)) or INSTRUMENTATION_ERROR)"
-count_call_expression = "_FI_COUNT__(%r,None)"
-
 # Seeks the pass for the replacement point.
 profile_transaction = """
 if True:
@@ -199,25 +216,36 @@ if True:
 		_FI_CONTINUE__(%r)
 """
 
-def construct_call_increment(node, area, path='/dev/null', lineno=1):
-	s = count_call_expression % (area,)
-	p = ast.parse(s, path)
-	k = p.body[0]
-	for x in ast.walk(k):
-		source.node_set_address(x, (-lineno, -1))
+def construct_call_increment(node, identifier, path='/dev/null', lineno=1, Load=ast.Load()):
+	"""
+	# Construct the statement `_FI_COUNT__(identifier, None)`.
+
+	# The nodes are built directly rather than parsing the expression as the
+	# form is fixed and this is performed for every counter.
+	"""
+	call = ast.Call(ast.Name('_FI_COUNT__', Load), [ast.Constant(identifier), ast.Constant(None)], [])
+	k = ast.Expr(call)
+
+	address = (-lineno, -1)
+	for x in (k, call, call.func, *call.args):
+		source.node_set_address(x, address)
+
+	return k
 
-	update = functools.partial(k.value.args.__setitem__, -1)
-	return k, update
+def construct_boolop_increment(node, identifier, path='/dev/null', lineno=1, Load=ast.Load()):
+	"""
+	# Construct the statement `(_FI_COUNT__(identifier, None) or node)`
+	# counting the evaluation of the expression, &node.
+	"""
+	call = ast.Call(ast.Name('_FI_COUNT__', Load), [ast.Constant(identifier), ast.Constant(None)], [])
+	op = ast.BoolOp(ast.Or(), [call, node])
+	expr = ast.Expr(op)
 
-def construct_boolop_increment(node, area, path='/dev/null', lineno=1):
-	s = count_boolop_expression % (area,)
-	p = ast.parse(s, path)
-	expr = p.body[0]
-	for x in ast.walk(expr):
-		source.node_set_address(x, (-lineno, -1))
+	address = (-lineno, -1)
+	for x in (expr, op, call, call.func, *call.args):
+		source.node_set_address(x, address)
 
-	update = functools.partial(expr.value.values.__setitem__, 1)
-	return expr, update
+	return expr
 
 def construct_profile_trap(identifier, container, nodes, path='/dev/null', lineno=1):
 	src = profile %(identifier,identifier)
@@ -230,67 +258,99 @@ def construct_profile_trap(identifier, container, nodes, path='/dev/null', linen
 
 	return trap
 
-def construct_initialization_nodes(path="/dev/null"):
-	"""
-	# Construct instrumentation initialization nodes for injection into an &ast.Module body.
-	"""
+@functools.lru_cache(4)
+def _parse_initialization_nodes(path):
 	nodes = ast.parse(coverage_module_context, path)
 	for x in ast.walk(nodes):
 		source.node_set_address(x, (-1, -1))
 
-	return nodes
+	return tuple(nodes.body)
 
-def instrument(record, path, noded, address):
+def construct_initialization_nodes(path="/dev/null"):
+	"""
+	# Construct instrumentation initialization nodes for injection into an &ast.Module body.
+
+	# The context is parsed once per &path and the statement nodes are shared
+	# by the returned modules; they are not modified by instrumentation or &module.inject.
 	"""
-	# Adjust the AST so that &node will record its execution.
+	return ast.Module(list(_parse_initialization_nodes(path)), [])
+
+def _instrument_pass(record, path, node, parent, field, index, address, identifier):
+	# Replace the pass statement with the counter.
+	note = construct_call_increment(node, identifier)
+	getattr(parent, field)[index] = note
+	record.add(address)
+
+def _instrument_expression(record, path, node, parent, field, index, address, identifier):
+	# Substitute the expression with the counting boolean operation.
+	note = construct_boolop_increment(node, identifier, path=path)
+	if index is None:
+		setattr(parent, field, note.value)
+	else:
+		getattr(parent, field)[index] = note.value
+	record.add(address)
+
+def _instrument_ignored(record, path, node, parent, field, index, address, identifier):
+	pass
+
+def _instrument_statement(record, path, node, parent, field, index, address, identifier):
+	# Insert the counter adjacent to the statement.
+	note = construct_call_increment(node, identifier)
+	if index is not None:
+		position=(0 if isinstance(node, source.InterruptNodes) else 1)
+		getattr(parent, field).insert(index+position, note)
+		record.add(address)
+	else:
+		assert False
+		pass # never
+
+def _subclasses(base):
+	yield base
+	for x in base.__subclasses__():
+		yield from _subclasses(x)
+
+# Instrumentation handlers selected by the exact type of the node.
+# Types not present are instrumented as statements.
+instrument_by_type = {}
+instrument_by_type.update((x, _instrument_expression) for x in _subclasses(ast.expr))
+instrument_by_type[ast.Pass] = _instrument_pass
+instrument_by_type[ast.arguments] = _instrument_ignored
+instrument_by_type[ast.arg] = _instrument_ignored
+
+def instrument(record, path, noded, address, identifier, select=instrument_by_type.get):
+	"""
+	# Adjust the AST so that &node will record its execution in
+	# the counter designated by &identifier.
 	"""
 
 	# Counter injection node.
 	node, parent, field, index = noded
-
-	if isinstance(node, ast.Pass):
-		note, update = construct_call_increment(node, address)
-		getattr(parent, field)[index] = note
-		record.add(address)
-	elif isinstance(node, ast.expr):
-		note, update = construct_boolop_increment(node, address, path=path)
-		update(node)
-		if index is None:
-			setattr(parent, field, note.value)
-		else:
-			getattr(parent, field)[index] = note.value
-		record.add(address)
-	elif isinstance(node, (ast.arguments, ast.arg)):
-		pass
-	else:
-		note, update = construct_call_increment(node, address)
-		if index is not None:
-			position=(0 if isinstance(node, source.InterruptNodes) else 1)
-			getattr(parent, field).insert(index+position, note)
-			record.add(address)
-		else:
-			assert False
-			pass # never
+	select(type(node), _instrument_statement)(record, path, node, parent, field, index, address, identifier)
 
 	return node
 
 def delineate(noded):
-	node = noded[0]
-	if hasattr(node, '_f_context'):
-		area = node._f_context[0][0:2] + node._f_area[2:]
+	nd = noded[0].__dict__
+	context = nd.get('_f_context')
+	if context is not None:
+		area = context[0][0:2] + nd['_f_area'][2:]
 	else:
-		area = getattr(node, '_f_area', None)
+		area = nd.get('_f_area')
 
 	return area
 
-def apply(record, path, noded):
-	node = noded[0]
-	if hasattr(node, '_f_context'):
-		area = node._f_context[0][0:2] + node._f_area[2:]
+def apply(record, path, noded, sites):
+	"""
+	# Instrument &noded using the counter identifier assigned to its area in &sites.
+	"""
+	nd = noded[0].__dict__
+	context = nd.get('_f_context')
+	if context is not None:
+		area = context[0][0:2] + nd['_f_area'][2:]
 	else:
-		area = node._f_area
+		area = nd['_f_area']
 
-	return instrument(record, path, noded, area)
+	return instrument(record, path, noded, area, sites.setdefault(area, len(sites)))
 
 def compile(factor, source, path, constants,
 		parse=source.parse,
@@ -301,21 +361,22 @@ def compile(factor, source, path, constants,
 	"""
 	# Compile Python source of a module into an instrumented &types.CodeObject
 	"""
-	srclines, tree, nodes = parse(source, path, filter=visit)
+	# &visit does not produce expression contexts, and
+	# nodes lacking an area are not produced by the join.
+	srclines, tree, nodes = parse(source, path, filter=visit, addressed=True)
 
-	for noded in nodes:
-		if not hasattr(noded[0], '_f_area'):
-			continue
-		if isinstance(noded[0], (ast.expr_context, ast.slice)):
-			continue
+	# Counter identifiers by area; indexes of the module's counter array.
+	sites = {}
 
-		apply(record, path, noded)
+	for noded in nodes:
+		apply(record, path, noded, sites)
 
 	# Insert profiling or coverage header before constants.
 	tree.body[0:0] = construct_initialization_nodes().body
 
-	# Add hash and canonical factor path.
+	# Add counter areas, hash, and canonical factor path.
 	constants.extend([
+		('_FI_AREAS__', tuple(sites)),
 		('__factor__', factor),
 		('__source_hash__', hash(source)),
 	])
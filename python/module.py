@@ -22,16 +22,19 @@ def hash_syntax(source, encoding='utf-8', hi=hashlib.sha3_256, hash_chunks=1024*
 		memory.truncate()
 	return h.hexdigest()
 
-def mkconstant(name, value, path='/dev/null', lineno=-1):
+def mkconstant(name, value, path='/dev/null', lineno=-1, Store=ast.Store()):
 	"""
 	# Create a constant for injection into a module.
+
+	# The assignment is constructed directly rather than parsing &constant_expression
+	# as &value may be large; instrumentation injects the areas of every counter.
 	"""
 
-	s = constant_expression % (name, value,)
-	p = ast.parse(s, path)
-	assert isinstance(p, ast.Module)
+	k = ast.Assign([ast.Name(name, Store)], ast.Constant(value))
+	for x in (k, k.targets[0], k.value):
+		x.lineno = x.end_lineno = 1
+		x.col_offset = x.end_col_offset = 0
 
-	k = p.body[0]
 	return k
 
 def inject(tree:ast.Module, constants:typing.Iterable[typing.Tuple[str,str]]):
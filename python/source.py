@@ -43,21 +43,40 @@ def sequence_nodes(node_list):
 	l.reverse()
 	return l
 
-def shallow(node, iter_fields=ast.iter_fields, isinstance=isinstance, list=list):
+def sequence_indexes(node_list):
+	# Reversed indexes of &node_list; &sequence_nodes without the pairs.
+	return range(len(node_list)-1, -1, -1)
+
+def children(node, AST=ast.AST, type=type, list=list, isinstance=isinstance):
+	"""
+	# &ast.iter_child_nodes implementation reading the fields directly from the node's dictionary.
+	"""
+	d = node.__dict__
+	for field in type(node)._fields:
+		v = d.get(field)
+		if isinstance(v, AST):
+			yield v
+		elif type(v) is list:
+			for x in v:
+				if isinstance(x, AST):
+					yield x
+
+def shallow(node, type=type, isinstance=isinstance, list=list):
 	"""
 	# &ast.iter_child_nodes implementation providing path context for node substitution.
 	"""
+	d = node.__dict__
 
-	for x in ((subnode, node, field, None) for field, subnode in iter_fields(node)):
-		subnode = x[0]
+	for field in type(node)._fields:
+		subnode = d.get(field)
 
 		if isinstance(subnode, list):
 			yield from (
-				(v, node, x[2], i) for i, v in sequence_nodes(subnode)
-				if isinstance(v, ast.AST)
+				(subnode[i], node, field, i) for i in sequence_indexes(subnode)
+				if isinstance(subnode[i], ast.AST)
 			)
 		elif isinstance(subnode, ast.AST):
-			yield x
+			yield (subnode, node, field, None)
 
 def bottom(tree, listdir=shallow, Queue=collections.deque):
 	"""
@@ -101,7 +120,7 @@ def node_remove_docstring(container):
 	del container.body[0]
 
 def associate_siblings(following, nodes,
-		iterate=ast.iter_child_nodes,
+		iterate=children,
 		chain=itertools.chain,
 		list=list,
 		isinstance=isinstance,
@@ -405,10 +424,12 @@ def _lookup_region(associations, contexts, tokens, tmap, node, list=list, isinst
 
 	return context if chain else (), ld
 
-def join(lookup, nodes):
+def join(lookup, nodes, addressed=False):
 	"""
 	# Assign the address information provided by &lookup to the nodes
 	# generated by the &nodes iterator.
+
+	# When &addressed is &True, nodes that were not assigned an area are not produced.
 	"""
 	for node_desc in nodes:
 		node = node_desc[0]
@@ -436,9 +457,12 @@ def join(lookup, nodes):
 			start, stop = nodeset[0][1]
 			node._f_area = start + stop
 
+		if addressed and not hasattr(node, '_f_area'):
+			continue
+
 		yield node_desc
 
-def _prepare(nodes, tokens, filter=bottom, identify=_lookup_region):
+def _prepare(nodes, tokens, filter=bottom, identify=_lookup_region, addressed=False):
 	# Note the syntax area of the nodes in the AST.
 	tmap = map_tokens(tokens)
 
@@ -453,7 +477,7 @@ def _prepare(nodes, tokens, filter=bottom, identify=_lookup_region):
 			d[(node.lineno, node.col_offset)].append(node)
 
 	lookup = functools.partial(_lookup_region, sa, d, tokens, tmap)
-	yield from join(lookup, filter(nodes))
+	yield from join(lookup, filter(nodes), addressed=addressed)
 
 def shift_column(lines, ln, co, *, encoding='utf-8'):
 	"""
@@ -475,10 +499,12 @@ def shift_column(lines, ln, co, *, encoding='utf-8'):
 		return (ln, 0)
 	return (ln, len(lines[ln-1][:co].encode(encoding)))
 
-def parse(source:str, path:str, filter=bottom, encoding='utf-8'):
+def parse(source:str, path:str, filter=bottom, encoding='utf-8', addressed=False):
 	"""
 	# Parse the given &source creating an &ast.Module whose child nodes have their exact areas
 	# assigned to the `_f_area` attribute.
+
+	# &addressed is given to &join in order to only produce the nodes that were assigned an area.
 	"""
 	nodes = ast.parse(source, path)
 	ast.fix_missing_locations(nodes)
@@ -495,7 +521,7 @@ def parse(source:str, path:str, filter=bottom, encoding='utf-8'):
 		for t in tokenize.tokenize(readline)
 	]
 
-	return sourcelines, nodes, _prepare(nodes, tokens, filter=filter)
+	return sourcelines, nodes, _prepare(nodes, tokens, filter=filter, addressed=addressed)
 
 if __name__ == '__main__':
 	import sys
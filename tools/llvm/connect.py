@@ -91,7 +91,8 @@ def main(inv:process.Invocation) -> process.Exit:
 	factors.configure()
 	pd, pj, fp = factors.split(__name__)
 	llvm_d = fp.container
-	llvm_factors = {k[0]: v[1] for k, v in pj.select(llvm_d)}
+	required = {llvm_d/'ipq', llvm_d/'delineate', llvm_d/'json'}
+	llvm_factors = {k[0]: v[1] for k, v in pj.select(llvm_d) if k[0] in required}
 
 	# Get the libraries and interfaces needed out of &query
 	v, src, merge, export, ipqd = query.instrumentation(files.root@llvmconfig)
@@ -1,16 +1,150 @@
 """
 # System queries for extracting usage information from `clang` and `llvm-config`.
 """
+import os
+import re
 import sys
+import json
+import hashlib
+import functools
 import itertools
+from concurrent.futures import ThreadPoolExecutor
 
 from fault.system import execution
 from fault.system import files
 
+class QueryError(Exception):
+	"""
+	# Raised when a query of a tool exits with a failure or produces no output.
+	"""
+
+def concurrently(type, executable, requests):
+	"""
+	# Execute &executable with each argument vector in &requests concurrently.
+
+	# [ Parameters ]
+	# /requests/
+		# Sequence of `(retrieve, argv)` pairs where `retrieve` is
+		# &execution.dereference or &execution.effect.
+
+	# [ Returns ]
+	# The `(exitcode, output)` pair of each request in the order of &requests.
+	"""
+	with ThreadPoolExecutor(max(1, len(requests))) as pool:
+		futures = [
+			pool.submit(retrieve, execution.KInvocation(*execution.prepare(type, executable, argv)))
+			for retrieve, argv in requests
+		]
+		return [f.result()[1:] for f in futures]
+
+def successful(executable, argv, result):
+	"""
+	# Decode the output of a query that is required to succeed.
+
+	# [ Exceptions ]
+	# /&QueryError/
+		# When the query exited with a failure or produced no output.
+		# Raised before &persistent can store the outputs.
+	"""
+	exitcode, output = result
+	if exitcode != 0 or not output.strip():
+		raise QueryError("query failed", executable, argv, exitcode, output)
+
+	return output.decode('utf-8')
+
+# Version of the stored query outputs; changed whenever their form changes.
+cache_format = 1
+
+def cache_path(kind, executable, parameters):
+	"""
+	# Identify the file storing the outputs of the &kind query of &executable.
+
+	# The key is derived from &executable as given along with the real path, modification
+	# time, and size of the file that it refers to so that reinstalled tools are queried again.
+	# &None is returned when the executable cannot be inspected.
+	"""
+	try:
+		route = os.path.realpath(executable)
+		st = os.stat(route)
+	except OSError:
+		return None
+
+	key = '\x00'.join([
+		str(cache_format), kind, executable,
+		route, str(st.st_mtime_ns), str(st.st_size),
+		repr(parameters),
+	])
+	root = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+	digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+	return os.path.join(root, 'fault', 'llvm-query', kind + '-' + digest + '.json')
+
+def persistent(query):
+	"""
+	# Store the outputs of the decorated &query on disk keyed by the
+	# queried executable; see &cache_path.
+
+	# &query must return a list of strings. Only process outputs are stored;
+	# filesystem probes depending on them are performed by the caller.
+	"""
+	@functools.wraps(query)
+	def cached(executable, *args, **kw):
+		path = cache_path(query.__name__, str(executable), (args, sorted(kw.items())))
+		if path is not None:
+			try:
+				with open(path) as f:
+					outputs = json.load(f)
+				if isinstance(outputs, list) and all(isinstance(x, str) for x in outputs):
+					return outputs
+			except Exception:
+				# Unreadable or malformed entries are treated as misses.
+				pass
+
+		outputs = query(executable, *args, **kw)
+
+		if path is not None:
+			tmp = path + '.' + str(os.getpid())
+			try:
+				os.makedirs(os.path.dirname(path), exist_ok=True)
+				with open(tmp, 'w') as f:
+					json.dump(outputs, f)
+				os.replace(tmp, path)
+			except Exception:
+				try:
+					os.unlink(tmp)
+				except OSError:
+					pass
+
+		return outputs
+	return cached
+
 def split_config_output(flag, output):
-	return set(map(str.strip, output.split(flag)))
+	# Set of the non-empty fields designated by &flag.
+	return {s for s in map(str.strip, output.split(flag)) if s}
+
+def runtime_library(directory, name, architecture):
+	"""
+	# Check for the conventionally named compiler runtime library, &name, in &directory
+	# without scanning the directory.
+
+	# Both the architecture qualified name and the unqualified name
+	# of per-target library directories are checked.
+	"""
+	candidates = ['libclang_rt.' + name + '.a']
+	if architecture:
+		candidates.insert(0, 'libclang_rt.' + name + '-' + architecture + '.a')
+
+	for x in candidates:
+		lib = directory / x
+		if lib.fs_type() == 'data':
+			return lib
+
+	return None
 
 def profile_library(prefix, architecture):
+	lib = runtime_library(prefix, 'profile', architecture)
+	if lib is not None:
+		return lib
+
 	profile_libs = [x for x in prefix.fs_iterfiles('data') if 'profile' in x.identifier]
 
 	if len(profile_libs) == 1:
@@ -70,16 +204,14 @@ def parse_clang_version_1(string):
 
 	return cctype, release, version, version_info, target
 
-def parse_clang_directories_1(string):
+def parse_clang_directories_1(string, fields=re.compile(r'^([^:\n]*):(.*)$', re.M)):
 	"""
 	# Parse -print-search-dirs output.
 	"""
-	search_dirs_data = [x.split(':', 1) for x in string.split('\n') if x]
-
-	return dict([
-		(k.strip(' =:').lower(), list((x.strip(' =') for x in v.split(':'))))
-		for k, v in search_dirs_data
-	])
+	return {
+		m.group(1).strip(' =:').lower(): [x.strip(' =') for x in m.group(2).split(':')]
+		for m in fields.finditer(string)
+	}
 
 def parse_clang_standards_1(string):
 	"""
@@ -95,6 +227,37 @@ def parse_clang_standards_1(string):
 		if x.strip()
 	}
 
+# Languages whose standards are identified by &clang.
+clang_languages = ('c', 'c++')
+
+@persistent
+def clang_outputs(executable, type='executable'):
+	"""
+	# Retrieve the decoded outputs of the `--version`, `-print-search-dirs`, and
+	# standards queries of the clang &executable.
+
+	# The invocations are independent and performed concurrently.
+	# The standards are listed by a failing compilation, so only
+	# the version and directory queries are required to succeed.
+	"""
+	queries = [['--version'], ['-print-search-dirs']]
+	probes = [
+		['-x', l, '-std=void.abczyx.1', '-c', '/dev/null', '-o', '/dev/null']
+		for l in clang_languages
+	]
+
+	results = concurrently(type, executable,
+		[(execution.dereference, x) for x in queries] +
+		[(execution.effect, x) for x in probes]
+	)
+
+	return [
+		successful(executable, argv, r)
+		for argv, r in zip(queries, results)
+	] + [
+		output.decode('utf-8') for exitcode, output in results[len(queries):]
+	]
+
 def clang(executable, type='executable', libdir='lib'):
 	"""
 	# Extract information from the given clang &executable.
@@ -103,19 +266,13 @@ def clang(executable, type='executable', libdir='lib'):
 	root = files.Path.from_absolute('/')
 	cc_route = files.Path.from_absolute(executable)
 
-	# gather compiler information.
-	x = execution.prepare(type, executable, ['--version'])
-	i = execution.KInvocation(*x)
-	pid, exitcode, data = execution.dereference(i)
-	data = data.decode('utf-8')
+	# Compiler information, search directories, and the standards of each language.
+	data, sdd, *stds = clang_outputs(executable, type=type)
 	cctype, release, version, version_info, target = parse_clang_version_1(data)
 
 	# Analyze the library search directories.
 	# Primarily interested in finding the crt*.o files for linkage.
-	x = execution.prepare(type, executable, ['-print-search-dirs'])
-	i = execution.KInvocation(*x)
-	pid, exitcode, sdd = execution.dereference(i)
-	search_dirs_data = parse_clang_directories_1(sdd.decode('utf-8'))
+	search_dirs_data = parse_clang_directories_1(sdd)
 
 	ccprefix = files.Path.from_absolute(search_dirs_data['programs'][0])
 
@@ -134,6 +291,11 @@ def clang(executable, type='executable', libdir='lib'):
 
 	if sys.platform in {'darwin'}:
 		builtins = cclib / 'libclang_rt.osx.a'
+	else:
+		builtins = runtime_library(cclib, 'builtins', arch)
+
+	if builtins is not None:
+		builtins = str(builtins)
 	else:
 		cclibs = [x for x in cclib.fs_iterfiles('data') if 'builtins' in x.identifier]
 
@@ -149,18 +311,10 @@ def clang(executable, type='executable', libdir='lib'):
 				# clang, but no libclang_rt.
 				builtins = None
 
-	libdirs = [
-		files.Path.from_relative(root, str(x).strip('/'))
-		for x in search_dirs_data['libraries']
-	]
-
-	standards = {}
-	for l in ('c', 'c++'):
-		x = execution.prepare(type, executable, [
-			'-x', l, '-std=void.abczyx.1', '-c', '/dev/null', '-o', '/dev/null',
-		])
-		pid, exitcode, stderr = execution.effect(execution.KInvocation(*x))
-		standards[l] = parse_clang_standards_1(stderr.decode('utf-8'))
+	standards = {
+		l: parse_clang_standards_1(stderr)
+		for l, stderr in zip(clang_languages, stds)
+	}
 
 	clang = {
 		'implementation': cctype.strip().replace(' ', '-').lower(),
@@ -174,50 +328,54 @@ def clang(executable, type='executable', libdir='lib'):
 
 	return clang
 
+@persistent
+def llvm_config_outputs(executable, type='executable'):
+	"""
+	# Retrieve the decoded outputs of the llvm-config &executable used by &instrumentation.
+
+	# Immediate queries are printed in the order given followed by
+	# the component libraries and then the component's system libraries.
+	# Components apply to the entire invocation, so coverage is queried separately.
+	"""
+	config_pipe = [
+		'--prefix', '--version', '--libdir', '--includedir', '--has-rtti',
+		'--libs', '--system-libs', 'profiledata',
+	]
+	covlibs_pipe = ['--libs', 'coverage']
+
+	queries = [config_pipe, covlibs_pipe]
+	results = concurrently(type, executable, [(execution.dereference, x) for x in queries])
+
+	return [successful(executable, argv, r) for argv, r in zip(queries, results)]
+
 def instrumentation(llvm_config_path, merge_path=None, export_path=None, type='executable'):
 	"""
 	# Identify instrumentation related commands and libraries for making extraction tools.
 	"""
 	srcpath = str(llvm_config_path)
-	v_pipe = ['--version']
-	libs_pipe = ['profiledata', '--libs']
-	syslibs_pipe = ['profiledata', '--system-libs']
-	covlibs_pipe = ['coverage', '--libs']
-	incs_pipe = ['--includedir']
-	libdir_pipe = ['--libdir']
-	rtti_pipe = ['--has-rtti']
-
-	po = lambda x: execution.dereference(execution.KInvocation(*execution.prepare(type, srcpath, x)))
-	outs = [
-		po([srcpath, '--prefix']),
-		po(v_pipe),
-		po(libs_pipe),
-		po(syslibs_pipe),
-		po(covlibs_pipe),
-		po(libdir_pipe),
-		po(incs_pipe),
-		po(rtti_pipe),
-	]
+	config, covlibs = llvm_config_outputs(srcpath, type=type)
+
+	# One line per query of &llvm_config_outputs; the final newline leaves an empty field.
+	lines = config.split('\n')
+	if lines[-1] == '':
+		del lines[-1]
+	if len(lines) != 7:
+		raise QueryError("unexpected llvm-config output", srcpath, config)
 
-	prefix, v, libs, syslibs, covlibs, libdirs, incdirs, rtti = [x[-1].decode('utf-8') for x in outs]
+	prefix, v, libdirs, incdirs, rtti, libs, syslibs = lines
 
 	libs = split_config_output('-l', libs)
-	libs.discard('')
 	libs.add('c++')
 
 	covlibs = split_config_output('-l', covlibs)
-	covlibs.discard('')
 
 	syslibs = split_config_output('-l', syslibs)
-	syslibs.discard('')
 	syslibs.add('c++')
 
 	libdirs = split_config_output('-L', libdirs)
-	libdirs.discard('')
 	dir, *reset = libdirs
 
 	incdirs = split_config_output('-I', incdirs)
-	incdirs.discard('')
 
 	if rtti.lower() in {'yes', 'true', 'on'}:
 		rtti = True